@@ -5,10 +5,12 @@ import sys
 # Save critical variables
 critical_vars = {
     'DEEPSEEK_API_KEY': os.environ.get('DEEPSEEK_API_KEY'),
+    'REDIS_URL': os.environ.get('REDIS_URL'),
     'PATH': os.environ.get('PATH', ''),
     'HOME': os.environ.get('HOME', ''),
     'LANG': os.environ.get('LANG', 'en_US.UTF-8'),
     'PORT': os.environ.get('PORT', '10000'),
+    'LOG_LEVEL': os.environ.get('LOG_LEVEL'),
 }
 
 # Clear ALL environment variables
@@ -19,71 +21,228 @@ for key, value in critical_vars.items():
     if value:
         os.environ[key] = value
 
-print("Environment cleaned. Current env vars:", list(os.environ.keys()))
+import logging
+
+# Logging is quiet by default (WARNING); set LOG_LEVEL=DEBUG to trace requests
+logging.basicConfig(format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+log = logging.getLogger('humanizer')
+try:
+    log.setLevel(os.environ.get('LOG_LEVEL', 'WARNING').upper())
+except ValueError:
+    log.setLevel(logging.WARNING)
+    log.warning("Unknown LOG_LEVEL %r, using WARNING", os.environ['LOG_LEVEL'])
+
+log.info("Environment cleaned. Current env vars: %s", list(os.environ.keys()))
 
 # NOW import other modules
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context, url_for
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from werkzeug.exceptions import HTTPException
+import orjson
 import re
 import hashlib
 import time
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 
 # Import OpenAI LAST
 from openai import OpenAI
 
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson (faster on large humanized texts)"""
+    sort_keys = False
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
-CORS(app)  # Allow requests from your WordPress site
+app.json = ORJSONProvider(app)
+CORS(app, expose_headers=['ETag'])  # Allow requests from your WordPress site
+
+# Largest request body accepted. 10,000 characters can take up to 6 bytes each
+# as JSON \uXXXX escapes, plus room for the surrounding object
+MAX_REQUEST_BYTES = 64 * 1024
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_BYTES  # Caps reads of bodies sent without a length
+
+# Cache to save API calls and reduce costs. With REDIS_URL set, entries live
+# in Redis and are shared by every gunicorn worker; otherwise each worker keeps
+# its own in-process LRU (most recently used at the end)
+CACHE_TTL = 3600  # seconds, Redis only
+CACHE_KEY_PREFIX = 'humanizer:'
+response_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+# DeepSeek calls in progress, by cache key: concurrent requests for the same
+# text wait on the first call instead of each hitting the API
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+redis_client = None
+if os.getenv('REDIS_URL'):
+    import redis
+    # Short timeouts so an unreachable Redis turns into a cache miss, not a hang
+    redis_client = redis.Redis.from_url(
+        os.environ['REDIS_URL'],
+        decode_responses=True,
+        socket_connect_timeout=1,
+        socket_timeout=1
+    )
+
+# Background jobs (/jobs) for clients that poll instead of holding a request
+# open. Jobs are tracked in this worker's memory, so polls must reach the same
+# worker. At most MAX_JOBS are tracked: new jobs are refused while that many
+# are pending, and only finished jobs are evicted (oldest first)
+MAX_JOBS = 1000
+_job_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix='humanize-job')
+_jobs = OrderedDict()
+_jobs_lock = threading.Lock()
+
+# Streaming: tokens are sent in batches that grow from 1 (fast first token)
+# by STREAM_BATCH_GROWTH up to STREAM_MAX_BATCH_SIZE, or whenever
+# STREAM_FLUSH_INTERVAL seconds have passed since the last send
+STREAM_BATCH_GROWTH = 3
+STREAM_MAX_BATCH_SIZE = 50
+STREAM_FLUSH_INTERVAL = 0.05
+
+# Post-processing: all forbidden items matched in a single pass over the text
+_RE_POST = re.compile(r'[—–]|\b[Mm]eanwhile\b|\b[Ff]lashpoint\b|which makes it\b')
+_REPL = {
+    '—': '-',
+    '–': '-',
+    'Meanwhile': 'At the same time',
+    'meanwhile': 'at the same time',
+    'Flashpoint': 'critical point',
+    'flashpoint': 'critical point',
+    'which makes it': 'so it\'s',
+}
+
+_RE_WHITESPACE = re.compile(r'\s+')
+
+def cache_key_for(text):
+    """Cache key for a piece of input text (not security-sensitive).
+    
+    Whitespace is collapsed first so texts differing only in spacing or
+    line breaks share a cache entry.
+    """
+    normalized = _RE_WHITESPACE.sub(' ', text.strip())
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).hexdigest()
+
+def cache_get(key):
+    """Return the cached humanized text for key (marking it recently used), or None"""
+    if redis_client is not None:
+        try:
+            return redis_client.get(CACHE_KEY_PREFIX + key)
+        except redis.RedisError as e:
+            # A cache outage shouldn't fail the request; treat it as a miss
+            log.warning("Redis get failed: %s", e)
+            return None
+    
+    with _cache_lock:
+        humanized_text = response_cache.get(key)
+        if humanized_text is not None:
+            response_cache.move_to_end(key)
+        return humanized_text
 
-# Cache to save API calls and reduce costs
-response_cache = {}
+def cache_put(key, humanized_text):
+    """Store humanized text, keeping only the 100 most recently used items"""
+    if redis_client is not None:
+        try:
+            redis_client.set(CACHE_KEY_PREFIX + key, humanized_text, ex=CACHE_TTL)
+        except redis.RedisError as e:
+            log.warning("Redis set failed: %s", e)
+        return
+    
+    with _cache_lock:
+        response_cache[key] = humanized_text
+        response_cache.move_to_end(key)
+        if len(response_cache) > 100:
+            response_cache.popitem(last=False)
+
+def cache_size():
+    """Number of cached entries (for Redis, keys in the whole database)"""
+    if redis_client is not None:
+        try:
+            return redis_client.dbsize()
+        except redis.RedisError as e:
+            log.warning("Redis dbsize failed: %s", e)
+            return None
+    return len(response_cache)
+
+# Shared DeepSeek client so its connection pool (and warm TLS connections)
+# is reused across requests instead of rebuilt for each one
+_deepseek_client = None
+_deepseek_client_lock = threading.Lock()
 
 def get_deepseek_client():
-    """Get DeepSeek API client - nuclear fix for proxy issues"""
+    """Get the shared DeepSeek API client, creating it on first use"""
+    global _deepseek_client
+    if _deepseek_client is None:
+        with _deepseek_client_lock:
+            if _deepseek_client is None:
+                _deepseek_client = create_deepseek_client()
+    return _deepseek_client
+
+def create_deepseek_client():
+    """Create a DeepSeek API client - nuclear fix for proxy issues"""
     api_key = os.getenv('DEEPSEEK_API_KEY')
     if not api_key:
         raise ValueError("DEEPSEEK_API_KEY not set")
     
-    print(f"DEEPSEEK_API_KEY: {'*' * 10}{api_key[-4:] if len(api_key) > 4 else ''}")
+    log.debug("DEEPSEEK_API_KEY: %s%s", '*' * 10, api_key[-4:] if len(api_key) > 4 else '')
     
-    # Method 1: Try direct instantiation first
+    # Method 1: Our own tuned httpx client (HTTP/2 + sized connection pool)
     try:
-        print("Attempt 1: Direct OpenAI instantiation")
-        client = OpenAI(
-            api_key=api_key,
-            base_url="https://api.deepseek.com/v1"
-        )
-        print("Success with direct instantiation")
-        return client
-    except TypeError as e:
-        print(f"Direct failed: {e}")
-    
-    # Method 2: Use the lower-level API
-    try:
-        print("Attempt 2: Using OpenAI with http_client")
+        log.debug("Attempt 1: Using OpenAI with tuned http_client")
         import httpx
         
         client = OpenAI(
             api_key=api_key,
             base_url="https://api.deepseek.com/v1",
+            max_retries=2,
             http_client=httpx.Client(
-                timeout=30.0,
+                transport=httpx.HTTPTransport(
+                    http2=True,  # Multiplex concurrent calls over one TLS connection
+                    retries=2,   # Connection-level retries
+                    limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+                ),
+                timeout=httpx.Timeout(60.0, connect=5.0),
                 # Explicitly NO proxies
             )
         )
-        print("Success with httpx client")
+        log.info("Success with httpx client")
         return client
     except Exception as e:
-        print(f"HTTPX method failed: {e}")
+        log.warning("HTTPX method failed: %s", e)
+    
+    # Method 2: Direct instantiation with the SDK's default http client
+    try:
+        log.debug("Attempt 2: Direct OpenAI instantiation")
+        client = OpenAI(
+            api_key=api_key,
+            base_url="https://api.deepseek.com/v1",
+            timeout=60.0,
+            max_retries=2
+        )
+        log.info("Success with direct instantiation")
+        return client
+    except TypeError as e:
+        log.warning("Direct failed: %s", e)
     
     # Method 3: Manual requests as last resort
-    print("Attempt 3: Manual requests fallback")
+    log.debug("Attempt 3: Manual requests fallback")
     
     class ManualDeepSeekClient:
         def __init__(self, api_key):
             self.api_key = api_key
             self.base_url = "https://api.deepseek.com/v1"
             
-        def chat_completions_create(self, model, messages, temperature=0.7, max_tokens=2000):
+        def chat_completions_create(self, model, messages, temperature=0.7, max_tokens=2000, stream=False):
             import requests
             import json
             
@@ -106,11 +265,23 @@ def get_deepseek_client():
                 timeout=30
             )
             response.raise_for_status()
+            choice = response.json()['choices'][0]
+            content = choice['message']['content']
+            finish_reason = choice.get('finish_reason')
+            if stream:
+                # No real streaming here: hand back the whole text as one chunk
+                return [type('obj', (object,), {
+                    'choices': [type('obj', (object,), {
+                        'delta': type('obj', (object,), {'content': content})(),
+                        'finish_reason': finish_reason
+                    })()]
+                })()]
             return type('obj', (object,), {
                 'choices': [type('obj', (object,), {
                     'message': type('obj', (object,), {
-                        'content': response.json()['choices'][0]['message']['content']
-                    })()
+                        'content': content
+                    })(),
+                    'finish_reason': finish_reason
                 })()]
             })()
     
@@ -123,112 +294,22 @@ def get_deepseek_client():
                 })()
             })()
     
-    print("Using manual requests fallback")
+    log.info("Using manual requests fallback")
     return ClientWrapper()
 
-def humanize_text_with_deepseek(ai_text):
-    """Your exact humanization logic from Cursor"""
-    client = get_deepseek_client()
-    
-    prompt = f"""
-Take AI-style text and rewrite it to sound like a natural college-level human writer while preserving the exact same meaning and information.
-
-TEXT TO HUMANIZE:
-{ai_text}
-
-**ZeroGPT Evasion Parameters to Implement:**
-
-**1. Perplexity Management**
-- Increase text unpredictability while maintaining coherence
-- Introduce grammatical variations (not all perfect)
-- Add subtle stylistic inconsistencies
-- Mix high and low probability word choices
-
-**2. Burstiness Enhancement**
-- Vary sentence lengths dramatically (some very short, some very long)
-- Create irregular rhythm in paragraphs
-- Use different transition styles between sentences
-- Mix simple, compound, and complex sentences unevenly
-
-**3. Repetition Pattern Avoidance**
-- Eliminate repeated sentence structures
-- Vary transitional phrasing
-- Use asymmetric grammatical constructions
-- Avoid formulaic openings and closings
-
-**4. Natural "Messiness"**
-- Add mild contradictions or qualifications
-- Include occasional tangential thoughts
-- Vary tone slightly within the text
-- Allow minor redundancy where humans would repeat for emphasis
-
-**5. Vocabulary Pattern Management**
-- **FORBIDDEN AI-SIGNATURE WORDS (NEVER USE THESE):**
-  Furthermore, Moreover, In contrast, Overall, Consequently, Additionally, Thus, Therefore, Hence, Nevertheless, Nonetheless, Notwithstanding, As a result, In conclusion, To summarize, Notably, Importantly, Essentially, Fundamentally, Ultimately, It is important to note, Significant, Demonstrates, In addition
-
-**6. Probability Distribution**
-- Include occasional rare or unexpected word choices
-- Add slightly awkward but understandable constructions
-- Create abrupt but natural stylistic shifts
-- Use colloquial expressions occasionally
-
----
-
-**VOCABULARY REPLACEMENT GUIDE:**
-
-**Transition Words Replacement:**
-- "Furthermore" → "Also," "What's more," "On top of that"
-- "Moreover" → "Not only that," "Plus," "And another thing"
-- "Therefore" → "So," "That's why," "Because of that"
-- "Consequently" → "As a result," "Which means," "So then"
-- "Additionally" → "Also," "Too," "Another thing"
-- "Ever since" → "Since" "When" "Because"
-
-**Formal Phrases to Simplify:**
-- "It is important to note" → "Worth mentioning," "Keep in mind," "Remember that"
-- "Significant" → "Important," "Major," "Key," "Big"
-- "Demonstrates" → "Shows," "Proves," "Points to," "Suggests"
-- "In conclusion" → "To wrap up," "So what does this mean?"
-- "To summarize" → "Long story short," "Basically," "In short"
-
-**Natural Human Patterns to Inject:**
-- Sentence starters: "Well,..." "So,..." "Actually,..." "I mean,..." "You know,..."
-- Qualifiers: "Kind of," "Sort of," "A bit," "Pretty much," "More or less"
-- Parenthetical asides: "(which is interesting because...)" "(if you think about it)"
-- Contractions: it's, don't, can't, won't, that's
-
-**Human Writing Imperfections to Include:**
-- Occasional sentence fragments
-- Mild run-on sentences
-- Starting sentences with "And" or "But"
-- Slightly overusing favorite words
-- Mixing casual and formal language
-
-**Never Use These Words or Symbols**
-- "—" (use "-" instead)
-- "Meanwhile" (use "At the same time")
-- "flashpoint" (use "critical point")
-- "which makes it" (use "so it's" or "making it")
-
----
-
-**OUTPUT REQUIREMENT:** Return ONLY the humanized text. No explanations.
-"""
+# Prompt text is constant; only the user's text is spliced in per request
+# (the SDK only reads messages, so the system message dict is shared)
+_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": "You are a writing coach helping students sound clear, natural, and human. Rewrite text to sound like a college student wrote it."
+}
 
-    try:
-        response = client.chat.completions.create(
-            model="deepseek-chat",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a writing coach helping students sound clear, natural, and human. Rewrite text to sound like a college student wrote it."
-                },
-                {
-                    "role": "user",
-                    "content": f"""
+_USER_TEMPLATE_PRE = """
 Here is a piece of text that feels a bit stiff or AI-like:
 
-\"\"\"{ai_text}\"\"\"
+\"\"\""""
+
+_USER_TEMPLATE_POST = """\"\"\"
 
 Please rewrite it so that:
 - it keeps the same ideas and factual content,
@@ -239,25 +320,193 @@ Please rewrite it so that:
 
 Return ONLY the rewritten text, with no extra commentary.
 """
-                }
-            ],
-            temperature=0.75,  # Good balance between creativity and consistency
-            max_tokens=4000,   # Enough for long texts
-        )
 
-        humanized_text = response.choices[0].message.content.strip()
-        
-        # Post-processing to enforce forbidden items
-        humanized_text = re.sub(r'[—–]', '-', humanized_text)
-        humanized_text = re.sub(r'\b[Mm]eanwhile\b', 'At the same time', humanized_text)
-        humanized_text = re.sub(r'\b[Ff]lashpoint\b', 'critical point', humanized_text)
-        humanized_text = re.sub(r'which makes it\b', 'so it\'s', humanized_text)
+def build_messages(ai_text):
+    """Chat messages asking DeepSeek to humanize ai_text"""
+    return [
+        _SYSTEM_MESSAGE,
+        {"role": "user", "content": _USER_TEMPLATE_PRE + ai_text + _USER_TEMPLATE_POST}
+    ]
+
+# Output token budget. Humanized text is about as long as the input (~4 chars
+# per token), so budget len/3 tokens plus headroom for short inputs rather than
+# always reserving the maximum
+MAX_OUTPUT_TOKENS = 4000
+
+def max_tokens_for(ai_text):
+    """max_tokens to request for humanizing ai_text"""
+    return min(MAX_OUTPUT_TOKENS, len(ai_text) // 3 + 256)
+
+def clean_humanized_text(text):
+    """Post-processing to enforce forbidden items"""
+    return _RE_POST.sub(lambda m: _REPL[m.group(0)], text.strip())
+
+def humanize_text_with_deepseek(ai_text):
+    """Your exact humanization logic from Cursor"""
+    client = get_deepseek_client()
+    
+    try:
+        max_tokens = max_tokens_for(ai_text)
+        while True:
+            response = client.chat.completions.create(
+                model="deepseek-chat",
+                messages=build_messages(ai_text),
+                temperature=0.75,  # Good balance between creativity and consistency
+                max_tokens=max_tokens,
+            )
+            if response.choices[0].finish_reason != 'length':
+                break
+            # Output was cut off: retry once with the full budget, and never
+            # return (and cache) a truncated rewrite
+            if max_tokens >= MAX_OUTPUT_TOKENS:
+                raise RuntimeError("Humanized text was truncated at the maximum output length")
+            log.warning("Output truncated at max_tokens=%d, retrying with %d", max_tokens, MAX_OUTPUT_TOKENS)
+            max_tokens = MAX_OUTPUT_TOKENS
+
+        return clean_humanized_text(response.choices[0].message.content)
         
-        return humanized_text
+    except Exception as e:
+        log.error("DeepSeek API error: %s", e)
+        raise
+
+def humanize_cached(ai_text, cache_key):
+    """Humanize through the cache; returns (humanized_text, cache_hit)"""
+    humanized_text = cache_get(cache_key)
+    if humanized_text is not None:
+        log.debug("Cache hit for key: %s", cache_key)
+        return humanized_text, True
+    
+    with _inflight_lock:
+        future = _inflight.get(cache_key)
+        is_owner = future is None
+        if is_owner:
+            future = Future()
+            _inflight[cache_key] = future
+    
+    if not is_owner:
+        log.debug("Waiting on in-flight request for key: %s", cache_key)
+        return future.result(), False
+    
+    try:
+        # A previous owner may have cached the text and left _inflight
+        # between our first lookup and taking ownership
+        humanized_text = cache_get(cache_key)
+        if humanized_text is not None:
+            log.debug("Cache hit for key: %s", cache_key)
+            future.set_result(humanized_text)
+            return humanized_text, True
         
+        # Process through DeepSeek
+        log.debug("Processing new text (length: %d chars)", len(ai_text))
+        humanized_text = humanize_text_with_deepseek(ai_text)
+        cache_put(cache_key, humanized_text)
+        future.set_result(humanized_text)
+        return humanized_text, False
     except Exception as e:
-        print(f"DeepSeek API error: {e}")
+        future.set_exception(e)
         raise
+    finally:
+        with _inflight_lock:
+            del _inflight[cache_key]
+
+def stream_humanized_tokens(ai_text):
+    """Yield raw DeepSeek tokens as they arrive (not post-processed).
+    
+    Raises after the last token if the output was truncated, so callers
+    don't cache it.
+    """
+    client = get_deepseek_client()
+    
+    stream = client.chat.completions.create(
+        model="deepseek-chat",
+        messages=build_messages(ai_text),
+        temperature=0.75,
+        max_tokens=max_tokens_for(ai_text),
+        stream=True,
+    )
+    finish_reason = None
+    for event in stream:
+        if not event.choices:
+            continue
+        if event.choices[0].delta.content:
+            yield event.choices[0].delta.content
+        finish_reason = event.choices[0].finish_reason or finish_reason
+    
+    if finish_reason == 'length':
+        raise RuntimeError("Humanized text was truncated at the maximum output length")
+
+def get_text_from_request():
+    """Validate the JSON body; returns (text, None) or (None, error response)"""
+    # Reject oversized bodies from the header alone, before reading or parsing
+    if request.content_length is not None and request.content_length > MAX_REQUEST_BYTES:
+        return None, (jsonify({
+            'success': False,
+            'error': 'Request body too large.'
+        }), 413)
+    
+    try:
+        # Bodies without a Content-Length are cut off at MAX_CONTENT_LENGTH
+        # while reading, so a body that fills the cap was too large
+        if len(request.get_data(cache=True)) >= MAX_REQUEST_BYTES:
+            return None, (jsonify({
+                'success': False,
+                'error': 'Request body too large.'
+            }), 413)
+        
+        data = request.get_json()
+    except HTTPException as e:
+        return None, (jsonify({
+            'success': False,
+            'error': e.description
+        }), e.code)
+    
+    if not data:
+        return None, (jsonify({
+            'success': False,
+            'error': 'No JSON data provided'
+        }), 400)
+    
+    ai_text = data.get('text', '').strip()
+    
+    # Validate input
+    if not ai_text:
+        return None, (jsonify({
+            'success': False,
+            'error': 'No text provided'
+        }), 400)
+    
+    # Check text length (limit to 10,000 characters)
+    if len(ai_text) > 10000:
+        return None, (jsonify({
+            'success': False,
+            'error': 'Text too long. Maximum 10,000 characters allowed.'
+        }), 400)
+    
+    return ai_text, None
+
+def result_payload(ai_text, humanized_text, cache_hit, start_time):
+    """Success body shared by /humanize, /humanize/stream and /jobs"""
+    return {
+        'success': True,
+        'humanized_text': humanized_text,
+        'processing_time': round(time.time() - start_time, 2),
+        'original_length': len(ai_text),
+        'humanized_length': len(humanized_text),
+        'cached': cache_hit
+    }
+
+def run_humanize_job(ai_text):
+    """Background job body: humanize and return the /humanize result payload"""
+    start_time = time.time()
+    humanized_text, cache_hit = humanize_cached(ai_text, cache_key_for(ai_text))
+    return result_payload(ai_text, humanized_text, cache_hit, start_time)
+
+def sse_event(payload, event=None):
+    """Format payload as a Server-Sent Event"""
+    message = f"data: {app.json.dumps(payload)}\n\n"
+    if event:
+        message = f"event: {event}\n{message}"
+    return message
 
 @app.route('/')
 def home():
@@ -279,70 +528,160 @@ def humanize():
     start_time = time.time()
     
     try:
-        # Get JSON data from request
-        data = request.get_json()
+        ai_text, error_response = get_text_from_request()
+        if error_response:
+            return error_response
         
-        if not data:
-            return jsonify({
-                'success': False,
-                'error': 'No JSON data provided'
-            }), 400
+        # Create cache key
+        cache_key = cache_key_for(ai_text)
         
-        ai_text = data.get('text', '').strip()
+        # The ETag is the cache key: a client that sends it back in
+        # If-None-Match already holds a humanization of this text. "*" is
+        # ignored, since it says nothing about which text the client has
+        if_none_match = request.if_none_match
+        if not if_none_match.star_tag and if_none_match.contains_weak(cache_key):
+            response = Response(status=304)
+            response.set_etag(cache_key)
+            return response
         
-        # Validate input
-        if not ai_text:
-            return jsonify({
+        humanized_text, cache_hit = humanize_cached(ai_text, cache_key)
+        
+        response = jsonify(result_payload(ai_text, humanized_text, cache_hit, start_time))
+        response.set_etag(cache_key)
+        response.headers['Cache-Control'] = 'private, max-age=3600'
+        return response
+        
+    except Exception as e:
+        processing_time = time.time() - start_time
+        log.error("Error processing request: %s", e)
+        
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'processing_time': round(processing_time, 2)
+        }), 500
+
+@app.route('/humanize/stream', methods=['POST'])
+def humanize_stream():
+    """Streaming variant of /humanize using Server-Sent Events.
+    
+    Sends raw tokens as they arrive, then a final 'done' event with the
+    post-processed text, since the forbidden-item pass needs the full output.
+    """
+    start_time = time.time()
+    
+    try:
+        ai_text, error_response = get_text_from_request()
+        if error_response:
+            return error_response
+    except Exception as e:
+        log.error("Error processing request: %s", e)
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    cache_key = cache_key_for(ai_text)
+    
+    def generate():
+        humanized_text = cache_get(cache_key)
+        cache_hit = humanized_text is not None
+        
+        try:
+            if cache_hit:
+                log.debug("Cache hit for key: %s", cache_key)
+            else:
+                log.debug("Streaming new text (length: %d chars)", len(ai_text))
+                parts = []
+                batch = []
+                batch_size = 1
+                last_flush = time.monotonic()
+                for token in stream_humanized_tokens(ai_text):
+                    parts.append(token)
+                    batch.append(token)
+                    if len(batch) >= batch_size or time.monotonic() - last_flush > STREAM_FLUSH_INTERVAL:
+                        yield sse_event({'text': ''.join(batch)})
+                        batch = []
+                        batch_size = min(batch_size * STREAM_BATCH_GROWTH, STREAM_MAX_BATCH_SIZE)
+                        last_flush = time.monotonic()
+                if batch:
+                    yield sse_event({'text': ''.join(batch)})
+                humanized_text = clean_humanized_text(''.join(parts))
+                cache_put(cache_key, humanized_text)
+        except Exception as e:
+            log.error("Error streaming request: %s", e)
+            yield sse_event({
                 'success': False,
-                'error': 'No text provided'
-            }), 400
+                'error': str(e),
+                'processing_time': round(time.time() - start_time, 2)
+            }, event='error')
+            return
         
-        # Check text length (limit to 10,000 characters)
-        if len(ai_text) > 10000:
+        yield sse_event(result_payload(ai_text, humanized_text, cache_hit, start_time), event='done')
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache'}
+    )
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """Queue text for humanization in the background; poll the returned job"""
+    try:
+        ai_text, error_response = get_text_from_request()
+        if error_response:
+            return error_response
+    except Exception as e:
+        log.error("Error processing request: %s", e)
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    job_id = uuid.uuid4().hex
+    with _jobs_lock:
+        pending = sum(1 for job in _jobs.values() if not job.done())
+        if pending >= MAX_JOBS:
             return jsonify({
                 'success': False,
-                'error': 'Text too long. Maximum 10,000 characters allowed.'
-            }), 400
-        
-        # Create cache key
-        cache_key = hashlib.md5(ai_text.encode()).hexdigest()
+                'error': 'Too many pending jobs. Try again later.'
+            }), 503, {'Retry-After': '30'}
         
-        # Check cache first
-        if cache_key in response_cache:
-            print(f"Cache hit for key: {cache_key}")
-            humanized_text = response_cache[cache_key]
-        else:
-            # Process through DeepSeek
-            print(f"Processing new text (length: {len(ai_text)} chars)")
-            humanized_text = humanize_text_with_deepseek(ai_text)
-            
-            # Cache for 1 hour (3600 seconds)
-            response_cache[cache_key] = humanized_text
-            # Simple cache cleanup (keep only last 100 items)
-            if len(response_cache) > 100:
-                # Remove oldest item
-                oldest_key = next(iter(response_cache))
-                del response_cache[oldest_key]
-        
-        processing_time = time.time() - start_time
+        _jobs[job_id] = _job_executor.submit(run_humanize_job, ai_text)
         
+        # Drop the oldest finished jobs; pending ones stay fetchable
+        if len(_jobs) > MAX_JOBS:
+            finished = [key for key, job in _jobs.items() if job.done()]
+            for key in finished[:len(_jobs) - MAX_JOBS]:
+                del _jobs[key]
+    
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status': 'pending'
+    }), 202, {'Location': url_for('get_job', job_id=job_id)}
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    """Result of a background job: 202 while pending, then the /humanize body"""
+    with _jobs_lock:
+        future = _jobs.get(job_id)
+    
+    if future is None:
+        return jsonify({
+            'success': False,
+            'error': 'Unknown job id'
+        }), 404
+    
+    if not future.done():
         return jsonify({
             'success': True,
-            'humanized_text': humanized_text,
-            'processing_time': round(processing_time, 2),
-            'original_length': len(ai_text),
-            'humanized_length': len(humanized_text),
-            'cached': cache_key in response_cache
-        })
-        
+            'job_id': job_id,
+            'status': 'pending'
+        }), 202
+    
+    try:
+        return jsonify(future.result())
     except Exception as e:
-        processing_time = time.time() - start_time
-        print(f"Error processing request: {e}")
-        
+        log.error("Error processing job %s: %s", job_id, e)
         return jsonify({
             'success': False,
-            'error': str(e),
-            'processing_time': round(processing_time, 2)
+            'error': str(e)
         }), 500
 
 @app.route('/status')
@@ -350,7 +689,8 @@ def status():
     """API status with cache info"""
     return jsonify({
         'status': 'operational',
-        'cache_size': len(response_cache),
+        'cache_size': cache_size(),
+        'cache_backend': 'redis' if redis_client is not None else 'memory',
         'service': 'AI Humanizer API'
     })
 